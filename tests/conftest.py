@@ -0,0 +1,24 @@
+"""
+Shared fixtures for the Mergington High School API tests
+"""
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from src.app import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Create a single test client for the FastAPI app, shared across the session"""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest_asyncio.fixture(scope="session")
+async def async_client():
+    """Create a single async client bound to the app's ASGI transport, shared across the session"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        yield client
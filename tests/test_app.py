@@ -3,37 +3,69 @@ Test suite for Mergington High School API
 Tests all endpoints including activities listing, signup, and unregister functionality
 """
 
+import asyncio
+import threading
+
 import pytest
-from fastapi.testclient import TestClient
-from src.app import app, activities
+from src.app import activities, signup_for_activity, unregister_from_activity
+
+EXPECTED_ACTIVITIES = frozenset({
+    "Chess Club", "Programming Class", "Gym Class",
+    "Soccer Team", "Basketball Club", "Art Club",
+    "Choir", "Debate Team", "Science Club"
+})
+
+ACTIVITY_FIELDS = frozenset({"description", "schedule", "max_participants", "participants"})
 
+# Participants from the seed data; reset_activities restores these after every test
+INITIAL_PARTICIPANTS = {name: list(details["participants"]) for name, details in activities.items()}
+INITIAL_COUNTS = {name: len(participants) for name, participants in INITIAL_PARTICIPANTS.items()}
 
-@pytest.fixture
-def client():
-    """Create a test client for the FastAPI app"""
-    return TestClient(app)
 
+@pytest.fixture(scope="module")
+def activities_payload(client):
+    """Fetch the GET /activities payload once and share it across the module"""
+    return client.get("/activities").json()
 
-@pytest.fixture
+
+@pytest.fixture(autouse=True)
 def reset_activities():
-    """Reset activities to initial state before each test"""
-    # Store original state
-    original_activities = {
-        name: {
-            "description": details["description"],
-            "schedule": details["schedule"],
-            "max_participants": details["max_participants"],
-            "participants": details["participants"].copy()
-        }
-        for name, details in activities.items()
-    }
-    
+    """Restore any participant lists changed by a test back to the seed data"""
     yield
-    
-    # Restore original state after test
-    for name, details in original_activities.items():
-        if name in activities:
-            activities[name]["participants"] = details["participants"].copy()
+
+    # Only rewrite lists that differ, in place so references held by the app stay valid
+    for name, seed in INITIAL_PARTICIPANTS.items():
+        participants = activities[name]["participants"]
+        if participants != seed:
+            participants[:] = seed
+
+
+class BarrierList(list):
+    """List whose membership checks wait for concurrent callers to line up"""
+
+    def __init__(self, iterable, parties):
+        super().__init__(iterable)
+        self.barrier = threading.Barrier(parties, timeout=0.5)
+
+    def __contains__(self, item):
+        # Answer first, then wait, so every caller has checked before any of them
+        # can act on the result; a serialized caller times out and carries on
+        found = super().__contains__(item)
+        try:
+            self.barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        return found
+
+
+def signup(client, activity, email):
+    """Sign up a participant through the API, letting httpx encode the URL"""
+    return client.post(f"/activities/{activity}/signup", params={"email": email})
+
+
+def unregister(client, activity, email):
+    """Unregister a participant through the API, letting httpx encode the URL"""
+    return client.delete(f"/activities/{activity}/unregister", params={"email": email})
 
 
 class TestRootEndpoint:
@@ -61,226 +93,213 @@ class TestActivitiesEndpoint:
         data = response.json()
         assert isinstance(data, dict)
     
-    def test_get_activities_contains_expected_fields(self, client):
+    def test_get_activities_contains_expected_fields(self, activities_payload):
         """Test that each activity contains required fields"""
-        response = client.get("/activities")
-        data = response.json()
-        
-        for activity_name, activity_details in data.items():
-            assert "description" in activity_details
-            assert "schedule" in activity_details
-            assert "max_participants" in activity_details
-            assert "participants" in activity_details
+        for activity_name, activity_details in activities_payload.items():
+            missing = ACTIVITY_FIELDS - activity_details.keys()
+            assert not missing, (activity_name, missing)
             assert isinstance(activity_details["participants"], list)
     
-    def test_get_activities_includes_all_activities(self, client):
+    def test_get_activities_includes_all_activities(self, activities_payload):
         """Test that all expected activities are returned"""
-        response = client.get("/activities")
-        data = response.json()
-        
-        expected_activities = [
-            "Chess Club", "Programming Class", "Gym Class",
-            "Soccer Team", "Basketball Club", "Art Club",
-            "Choir", "Debate Team", "Science Club"
-        ]
-        
-        for activity in expected_activities:
-            assert activity in data
+        missing = EXPECTED_ACTIVITIES - activities_payload.keys()
+        assert not missing, missing
 
 
 class TestSignupEndpoint:
     """Tests for the POST /activities/{activity_name}/signup endpoint"""
     
-    def test_signup_success(self, client, reset_activities):
+    def test_signup_success(self, client):
         """Test successful signup for an activity"""
-        response = client.post(
-            "/activities/Chess%20Club/signup?email=test@mergington.edu"
-        )
+        response = signup(client, "Chess Club", "test@mergington.edu")
         assert response.status_code == 200
         data = response.json()
         assert "message" in data
-        assert "test@mergington.edu" in data["message"]
-        assert "Chess Club" in data["message"]
+        assert data["email"] == "test@mergington.edu"
+        assert data["activity"] == "Chess Club"
     
-    def test_signup_adds_participant_to_activity(self, client, reset_activities):
-        """Test that signup actually adds participant to the activity"""
+    def test_signup_adds_participant_to_activity(self):
+        """Test that the signup handler actually adds participant to the activity"""
         email = "newstudent@mergington.edu"
         activity = "Chess Club"
         
         # Get initial participants
-        initial_response = client.get("/activities")
-        initial_participants = initial_response.json()[activity]["participants"]
+        initial_participants = list(activities[activity]["participants"])
         
         # Sign up
-        client.post(f"/activities/{activity}/signup?email={email}")
+        signup_for_activity(activity, email)
         
         # Verify participant was added
-        after_response = client.get("/activities")
-        after_participants = after_response.json()[activity]["participants"]
+        after_participants = activities[activity]["participants"]
         
         assert email not in initial_participants
         assert email in after_participants
         assert len(after_participants) == len(initial_participants) + 1
     
-    def test_signup_for_nonexistent_activity(self, client, reset_activities):
-        """Test signup for an activity that doesn't exist"""
-        response = client.post(
-            "/activities/Nonexistent%20Activity/signup?email=test@mergington.edu"
+    def test_signup_with_special_characters_in_email(self, client):
+        """Test signup with special characters in email"""
+        # Use a dot in the email which is common and safe in URLs
+        email = "test.user@mergington.edu"
+        activity = "Programming Class"
+        
+        response = signup(client, activity, email)
+        assert response.status_code == 200
+        
+        # Verify it was added correctly
+        participants = activities[activity]["participants"]
+        assert email in participants
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicate_signup(self, async_client, monkeypatch):
+        """Test that concurrent signups with the same email only register once"""
+        email = "race@mergington.edu"
+        activity = "Choir"
+        
+        # Hold each membership check until both requests have reached it, so
+        # without activities_lock both pass the duplicate check before either appends
+        monkeypatch.setitem(
+            activities[activity], "participants",
+            BarrierList(activities[activity]["participants"], parties=2)
         )
-        assert response.status_code == 404
-        data = response.json()
-        assert "detail" in data
-        assert "not found" in data["detail"].lower()
+        
+        responses = await asyncio.gather(
+            *(signup(async_client, activity, email) for _ in range(2))
+        )
+        status_codes = sorted(response.status_code for response in responses)
+        assert status_codes == [200, 400]
+        assert activities[activity]["participants"].count(email) == 1
     
-    def test_signup_duplicate_participant(self, client, reset_activities):
+    def test_signup_duplicate_participant(self, client):
         """Test that signing up twice with same email returns error"""
         email = "duplicate@mergington.edu"
         activity = "Chess Club"
         
         # First signup should succeed
-        response1 = client.post(f"/activities/{activity}/signup?email={email}")
+        response1 = signup(client, activity, email)
         assert response1.status_code == 200
         
-        # Second signup should fail
-        response2 = client.post(f"/activities/{activity}/signup?email={email}")
+        # Second signup should fail and leave a single entry
+        response2 = signup(client, activity, email)
         assert response2.status_code == 400
         data = response2.json()
         assert "detail" in data
         assert "already signed up" in data["detail"].lower()
+        assert activities[activity]["participants"].count(email) == 1
     
-    def test_signup_with_special_characters_in_email(self, client, reset_activities):
-        """Test signup with special characters in email"""
-        # Use a dot in the email which is common and safe in URLs
-        email = "test.user@mergington.edu"
-        activity = "Programming Class"
-        
-        response = client.post(
-            f"/activities/{activity}/signup?email={email}"
-        )
-        assert response.status_code == 200
-        
-        # Verify it was added correctly
-        after_response = client.get("/activities")
-        participants = after_response.json()[activity]["participants"]
-        assert email in participants
+    @pytest.mark.parametrize("activity,email,expected_status,expected_detail", [
+        ("Nonexistent Activity", "test@mergington.edu", 404, "not found"),
+        ("Chess Club", "michael@mergington.edu", 400, "already signed up"),
+    ])
+    def test_signup_errors(self, client, activity, email,
+                           expected_status, expected_detail):
+        """Test signup for a missing activity or an already registered participant"""
+        response = signup(client, activity, email)
+        assert response.status_code == expected_status
+        data = response.json()
+        assert "detail" in data
+        assert expected_detail in data["detail"].lower()
 
 
 class TestUnregisterEndpoint:
     """Tests for the DELETE /activities/{activity_name}/unregister endpoint"""
     
-    def test_unregister_success(self, client, reset_activities):
+    def test_unregister_success(self, client):
         """Test successful unregistration from an activity"""
         # First sign up a participant
         email = "unregister@mergington.edu"
         activity = "Chess Club"
-        client.post(f"/activities/{activity}/signup?email={email}")
+        signup(client, activity, email)
         
         # Then unregister
-        response = client.delete(
-            f"/activities/{activity}/unregister?email={email}"
-        )
+        response = unregister(client, activity, email)
         assert response.status_code == 200
         data = response.json()
         assert "message" in data
-        assert email in data["message"]
-        assert activity in data["message"]
+        assert data["email"] == email
+        assert data["activity"] == activity
     
-    def test_unregister_removes_participant(self, client, reset_activities):
-        """Test that unregister actually removes participant from activity"""
+    def test_unregister_removes_participant(self):
+        """Test that the unregister handler actually removes participant from activity"""
         email = "remove@mergington.edu"
         activity = "Science Club"
         
         # Sign up
-        client.post(f"/activities/{activity}/signup?email={email}")
+        signup_for_activity(activity, email)
         
         # Verify participant is there
-        before_response = client.get("/activities")
-        before_participants = before_response.json()[activity]["participants"]
+        before_participants = list(activities[activity]["participants"])
         assert email in before_participants
         
         # Unregister
-        client.delete(f"/activities/{activity}/unregister?email={email}")
+        unregister_from_activity(activity, email)
         
         # Verify participant was removed
-        after_response = client.get("/activities")
-        after_participants = after_response.json()[activity]["participants"]
+        after_participants = activities[activity]["participants"]
         assert email not in after_participants
         assert len(after_participants) == len(before_participants) - 1
     
-    def test_unregister_nonexistent_activity(self, client, reset_activities):
-        """Test unregister from an activity that doesn't exist"""
-        response = client.delete(
-            "/activities/Nonexistent%20Activity/unregister?email=test@mergington.edu"
-        )
-        assert response.status_code == 404
-        data = response.json()
-        assert "detail" in data
-        assert "not found" in data["detail"].lower()
-    
-    def test_unregister_participant_not_signed_up(self, client, reset_activities):
-        """Test unregister for a participant who isn't signed up"""
-        email = "notsignedup@mergington.edu"
-        activity = "Chess Club"
-        
-        response = client.delete(f"/activities/{activity}/unregister?email={email}")
-        assert response.status_code == 400
-        data = response.json()
-        assert "detail" in data
-        assert "not signed up" in data["detail"].lower()
-    
-    def test_unregister_existing_participant(self, client, reset_activities):
+    def test_unregister_existing_participant(self, client):
         """Test unregister for a participant who was already in the activity"""
         # Use an existing participant from the initial data
         email = "michael@mergington.edu"
         activity = "Chess Club"
         
         # Verify participant exists
-        before_response = client.get("/activities")
-        before_participants = before_response.json()[activity]["participants"]
-        assert email in before_participants
+        assert email in activities[activity]["participants"]
         
         # Unregister
-        response = client.delete(f"/activities/{activity}/unregister?email={email}")
+        response = unregister(client, activity, email)
         assert response.status_code == 200
         
         # Verify removal
-        after_response = client.get("/activities")
-        after_participants = after_response.json()[activity]["participants"]
-        assert email not in after_participants
+        assert email not in activities[activity]["participants"]
+    
+    @pytest.mark.parametrize("activity,email,expected_status,expected_detail", [
+        ("Nonexistent Activity", "test@mergington.edu", 404, "not found"),
+        ("Chess Club", "notsignedup@mergington.edu", 400, "not signed up"),
+    ])
+    def test_unregister_errors(self, client, activity, email,
+                               expected_status, expected_detail):
+        """Test unregister from a missing activity or for a participant who isn't signed up"""
+        response = unregister(client, activity, email)
+        assert response.status_code == expected_status
+        data = response.json()
+        assert "detail" in data
+        assert expected_detail in data["detail"].lower()
 
 
+@pytest.mark.slow
 class TestEndToEndScenarios:
     """End-to-end test scenarios"""
     
-    def test_complete_signup_and_unregister_flow(self, client, reset_activities):
+    def test_complete_signup_and_unregister_flow(self, client):
         """Test complete flow of signing up and then unregistering"""
         email = "e2e@mergington.edu"
         activity = "Debate Team"
         
-        # Get initial state
-        initial_response = client.get("/activities")
-        initial_count = len(initial_response.json()[activity]["participants"])
-        
         # Sign up
-        signup_response = client.post(f"/activities/{activity}/signup?email={email}")
+        signup_response = signup(client, activity, email)
         assert signup_response.status_code == 200
         
         # Verify signup
-        after_signup = client.get("/activities")
-        after_signup_count = len(after_signup.json()[activity]["participants"])
-        assert after_signup_count == initial_count + 1
+        after_signup_count = len(activities[activity]["participants"])
+        assert after_signup_count == INITIAL_COUNTS[activity] + 1
         
         # Unregister
-        unregister_response = client.delete(f"/activities/{activity}/unregister?email={email}")
+        unregister_response = unregister(client, activity, email)
         assert unregister_response.status_code == 200
         
         # Verify unregister
-        after_unregister = client.get("/activities")
-        after_unregister_count = len(after_unregister.json()[activity]["participants"])
-        assert after_unregister_count == initial_count
+        after_unregister_count = len(activities[activity]["participants"])
+        assert after_unregister_count == INITIAL_COUNTS[activity]
+
+
+class TestConcurrentSignups:
+    """Concurrent signup scenarios driven through the async client"""
     
-    def test_multiple_participants_same_activity(self, client, reset_activities):
-        """Test multiple participants signing up for the same activity"""
+    @pytest.mark.asyncio
+    async def test_multiple_participants_same_activity(self, async_client):
+        """Test multiple participants signing up concurrently for the same activity"""
         activity = "Art Club"
         emails = [
             "student1@mergington.edu",
@@ -288,34 +307,33 @@ class TestEndToEndScenarios:
             "student3@mergington.edu"
         ]
         
-        # Get initial count
-        initial_response = client.get("/activities")
-        initial_count = len(initial_response.json()[activity]["participants"])
-        
-        # Sign up all students
-        for email in emails:
-            response = client.post(f"/activities/{activity}/signup?email={email}")
+        # Sign up all students concurrently
+        responses = await asyncio.gather(
+            *(signup(async_client, activity, email) for email in emails)
+        )
+        for response in responses:
             assert response.status_code == 200
         
         # Verify all were added
-        final_response = client.get("/activities")
-        final_participants = final_response.json()[activity]["participants"]
-        assert len(final_participants) == initial_count + len(emails)
+        final_participants = activities[activity]["participants"]
+        assert len(final_participants) == INITIAL_COUNTS[activity] + len(emails)
         
         for email in emails:
             assert email in final_participants
     
-    def test_participant_signs_up_for_multiple_activities(self, client, reset_activities):
-        """Test same participant signing up for multiple activities"""
+    @pytest.mark.asyncio
+    async def test_participant_signs_up_for_multiple_activities(self, async_client):
+        """Test same participant signing up concurrently for multiple activities"""
         email = "multisport@mergington.edu"
         activities_list = ["Soccer Team", "Basketball Club", "Gym Class"]
         
-        # Sign up for all activities
-        for activity in activities_list:
-            response = client.post(f"/activities/{activity}/signup?email={email}")
+        # Sign up for all activities concurrently
+        responses = await asyncio.gather(
+            *(signup(async_client, activity, email) for activity in activities_list)
+        )
+        for response in responses:
             assert response.status_code == 200
         
         # Verify participant is in all activities
-        all_activities = client.get("/activities").json()
         for activity in activities_list:
-            assert email in all_activities[activity]["participants"]
+            assert email in activities[activity]["participants"]